@@ -1,3 +1,4 @@
+from collections import deque
 from copy import deepcopy
 
 from target_postgres import json_schema, singer
@@ -245,139 +246,109 @@ def _get_streamed_table_records(key_properties, records):
     return records_map
 
 
-def _denest_subrecord(table_path,
-                      prop_path,
-                      parent_record,
-                      record,
-                      records_map,
-                      key_properties,
-                      pk_fks,
-                      level):
-    """"""
-    """
-    {...}
+def _denest_records(table_path, records, records_map, key_properties, pk_fks=None, level=-1):
     """
-    for prop, value in record.items():
-        """
-        str : {...} | [...] | ???None??? | <literal>
-        """
-
-        if isinstance(value, dict):
-            """
-            {...}
-            """
-            _denest_subrecord(table_path + (prop,),
-                              prop_path + (prop,),
-                              parent_record,
-                              value,
-                              records_map,
-                              key_properties,
-                              pk_fks,
-                              level)
-
-        elif isinstance(value, list):
-            """
-            [...]
-            """
-            _denest_records(table_path + (prop,),
-                            value,
-                            records_map,
-                            key_properties,
-                            pk_fks=pk_fks,
-                            level=level + 1)
-
-        elif value is None:
-            """
-            None
-            """
-            continue
+    Denest `records` into `records_map`.
 
-        else:
-            """
-            <literal>
-            """
-            parent_record[prop_path + (prop,)] = (json_schema.python_type(value), value)
-
-
-def _denest_record(table_path, record, records_map, key_properties, pk_fks, level):
-    """"""
-    """
-    {...}
+    Works through an explicit queue of record lists and a stack of nested objects per record,
+    rather than recursing for every nested object and array.
     """
-    denested_record = {}
-    for prop, value in record.items():
+    ## (table_path, records, pk_fks, level) for each list of records still to be denested
+    pending_records = deque([(table_path, records, pk_fks, level)])
+    push_records = pending_records.append
+    pop_records = pending_records.popleft
+
+    ## Tree of the `prop_path`s seen so far, {prop: (prop_path, {prop: ...})}, so that all
+    ## denested records share one tuple per path rather than each allocating their own
+    prop_paths = {}
+
+    ## Resolved once here, rather than through the modules for every value of every object below
+    python_type = json_schema.python_type
+    literal_types = json_schema._PYTHON_TYPE_TO_JSON_SCHEMA
+    VALUE = singer.VALUE
+
+    while pending_records:
+        table_path, records, pk_fks, level = pop_records()
         """
-        str : {...} | [...] | None | <literal>
+        [{...} ...] | [[...] ...] | [literal ...]
         """
-
-        if isinstance(value, dict):
-            """
-            {...}
-            """
-            _denest_subrecord(table_path + (prop,),
-                              (prop,),
-                              denested_record,
-                              value,
-                              records_map,
-                              key_properties,
-                              pk_fks,
-                              level)
-
-        elif isinstance(value, list):
-            """
-            [...]
-            """
-            _denest_records(table_path + (prop,),
-                            value,
-                            records_map,
-                            key_properties,
-                            pk_fks=pk_fks,
-                            level=level + 1)
-
-        elif value is None:
-            """
-            None
-            """
+        if not records:
             continue
 
-        else:
-            """
-            <literal>
-            """
-            denested_record[(prop,)] = (json_schema.python_type(value), value)
-
-    if table_path not in records_map:
-        records_map[table_path] = []
-    records_map[table_path].append(denested_record)
+        append_table_record = records_map.setdefault(table_path, []).append
 
-
-def _denest_records(table_path, records, records_map, key_properties, pk_fks=None, level=-1):
-    row_index = 0
-    """
-    [{...} ...] | [[...] ...] | [literal ...]
-    """
-    for record in records:
         if pk_fks:
-            record_pk_fks = pk_fks.copy()
-            record_pk_fks[singer.LEVEL_FMT.format(level)] = row_index
-
-            if not isinstance(record, dict):
+            level_key = singer.LEVEL_FMT.format(level)
+        else:  ## top level
+            source_pk_keys = [(singer.SOURCE_PK_PREFIX + key, key) for key in key_properties]
+
+        for row_index, record in enumerate(records):
+            if pk_fks:
+                record_pk_fks = {**pk_fks, level_key: row_index}
+
+                if not isinstance(record, dict):
+                    """
+                    [...] | literal
+                    """
+                    record = {VALUE: record}
+
+                record.update(record_pk_fks)
+            else:  ## top level
+                record_pk_fks = {}
+                for source_pk_key, key in source_pk_keys:
+                    record_pk_fks[source_pk_key] = record[key]
+                if singer.SEQUENCE in record:
+                    record_pk_fks[singer.SEQUENCE] = record[singer.SEQUENCE]
+
+            denested_record = {}
+            ## (table_path, prop_path, prop_paths, {...}) for the record and each object nested within it
+            objects = [(table_path, tuple(), prop_paths, record)]
+            while objects:
+                object_table_path, prop_path, child_prop_paths, obj = objects.pop()
                 """
-                [...] | literal
+                {...}
                 """
-                record = {singer.VALUE: record}
-
-            for key, value in record_pk_fks.items():
-                record[key] = value
-            row_index += 1
-        else:  ## top level
-            record_pk_fks = {}
-            for key in key_properties:
-                record_pk_fks[singer.SOURCE_PK_PREFIX + key] = record[key]
-            if singer.SEQUENCE in record:
-                record_pk_fks[singer.SEQUENCE] = record[singer.SEQUENCE]
-
-        """
-        {...}
-        """
-        _denest_record(table_path, record, records_map, key_properties, record_pk_fks, level)
+                for prop, value in obj.items():
+                    """
+                    str : None | <literal> | {...} | [...]
+                    """
+
+                    if value is None:
+                        """
+                        None
+                        """
+                        continue
+
+                    ## Literals are by far the most common values, so are recognized by their exact type first
+                    value_type = literal_types.get(type(value))
+
+                    if value_type is None:
+                        if isinstance(value, dict):
+                            """
+                            {...}
+                            """
+                            child = child_prop_paths.get(prop)
+                            if child is None:
+                                child = child_prop_paths[prop] = (prop_path + (prop,), {})
+                            objects.append((object_table_path + (prop,), child[0], child[1], value))
+                            continue
+
+                        if isinstance(value, list):
+                            """
+                            [...]
+                            """
+                            push_records((object_table_path + (prop,), value, record_pk_fks, level + 1))
+                            continue
+
+                        ## Raises for unknown types
+                        value_type = python_type(value)
+
+                    """
+                    <literal>
+                    """
+                    child = child_prop_paths.get(prop)
+                    if child is None:
+                        child = child_prop_paths[prop] = (prop_path + (prop,), {})
+                    denested_record[child[0]] = (value_type, value)
+
+            append_table_record(denested_record)
@@ -1,5 +1,6 @@
 from copy import deepcopy
 import decimal
+from functools import lru_cache
 import json
 import re
 
@@ -580,9 +581,15 @@ def _type_shorthand(type_s):
 
 
 def shorthand(schema):
-    t = deepcopy(get_type(schema))
+    return _shorthand(tuple(get_type(schema)), schema.get('format'))
 
-    if 'format' in schema and 'date-time' == schema['format'] and STRING in t:
+
+## Schemas are compared by shorthand over and over when upserting tables, for only a handful of distinct types
+@lru_cache()
+def _shorthand(types, format):
+    t = list(types)
+
+    if 'date-time' == format and STRING in t:
         t.remove(STRING)
         t.append('date-time')
 
@@ -1,33 +1,94 @@
+from collections import OrderedDict
 from copy import deepcopy
 import csv
-from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, partial
 import io
+from itertools import chain, islice
 import json
 import logging
+import math
 import re
+import struct
 import time
 import uuid
 import hashlib
 
 import arrow
 from psycopg2 import sql
-from psycopg2.extras import LoggingConnection, LoggingCursor
+from psycopg2.extensions import encodings
+from psycopg2.extras import execute_values, LoggingConnection, LoggingCursor
 
 from target_postgres import json_schema, singer
 from target_postgres.exceptions import PostgresError
 from target_postgres.sql_base import SEPARATOR, SQLInterface
 
 
+## `COPY` text format representation of `NULL`, and escapes for special characters within values
+COPY_NULL = '\\N'
+_COPY_TEXT_ESCAPES = str.maketrans({'\\': '\\\\',
+                                    '\n': '\\n',
+                                    '\r': '\\r',
+                                    '\t': '\\t'})
+## `COPY ... CSV` representation of `NULL` for subclasses overriding `persist_csv_rows`
 RESERVED_NULL_DEFAULT = 'NULL'
-
-@lru_cache(maxsize=128)
-def _format_datetime(value):
+## Number of characters/bytes buffered per `read` of the `COPY` payload
+COPY_BUFFER_SIZE = 128 * 1024
+## Tables with fewer rows than this are written with a single `INSERT`, as the fixed
+## overhead of `COPY` outweighs its per row savings for them
+INSERT_ROWS_THRESHOLD = 100
+## Number of table shapes whose merge SQL is kept, least recently used first out
+MERGE_SQL_CACHE_SIZE = 256
+
+## `COPY` binary format framing
+COPY_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_BINARY_TRAILER = struct.pack('>h', -1)
+COPY_BINARY_NULL = struct.pack('>i', -1)
+
+_BINARY_INT2 = struct.Struct('>h')
+_BINARY_INT4 = struct.Struct('>i')
+_BINARY_BOOLEAN = struct.Struct('>i?')
+_BINARY_BIGINT = struct.Struct('>iq')
+_BINARY_DOUBLE = struct.Struct('>id')
+_BINARY_UUID_LENGTH = _BINARY_INT4.pack(16)
+
+## Matches the `_sdc_level_<n>_id` columns of denested sub tables
+_SUBKEY_PATTERN = re.compile(singer.LEVEL_FMT.format('[0-9]+'))
+
+_POSTGRES_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+## Column DDL/DML, composed once and only formatted with identifiers per call
+_ADD_COLUMNS_SQL = sql.SQL('''
+    ALTER TABLE {table_schema}.{table_name}
+    {columns};
+''')
+_ADD_COLUMN_SQL = sql.SQL('ADD COLUMN {column_name} {data_type}')
+_MIGRATE_COLUMN_SQL = sql.SQL('''
+    UPDATE {table_schema}.{table_name}
+    SET {to_column} = {from_column};
+''')
+_DROP_COLUMN_SQL = sql.SQL('''
+    ALTER TABLE {table_schema}.{table_name}
+    DROP COLUMN {column_name};
+''')
+_MAKE_COLUMN_NULLABLE_SQL = sql.SQL('''
+    ALTER TABLE {table_schema}.{table_name}
+    ALTER COLUMN {column_name} DROP NOT NULL;
+''')
+
+
+## Records in a batch commonly share timestamps, eg, extraction times
+@lru_cache(maxsize=4096)
+def _parse_datetime(value):
     """
-    Format a datetime value. This is only called from the
+    Parse a datetime value. This is only called from the
     PostgresTarget.serialize_table_record_datetime_value
     but this non-method version allows caching
     """
-    return arrow.get(value).format('YYYY-MM-DD HH:mm:ss.SSSSZZ')
+    parsed = arrow.get(value).datetime
+    ## Persist with the same 100 microsecond precision as has always been written
+    return parsed.replace(microsecond=parsed.microsecond - parsed.microsecond % 100)
 
 def _update_schema_0_to_1(table_metadata, table_schema):
     """
@@ -95,12 +156,128 @@ class MillisLoggingConnection(LoggingConnection):
 
 
 
+def _copy_text_value(value):
+    """
+    Serialize `value` for a `COPY ... (FORMAT text)` payload.
+    :param value: literal
+    :return: string
+    """
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, str):
+        return value.translate(_COPY_TEXT_ESCAPES)
+    return str(value)
+
+
+def _copy_text_row(row):
+    return '\t'.join([_copy_text_value(value) for value in row]) + '\n'
+
+
+def _copy_binary_text(encoding, value):
+    encoded = value.encode(encoding)
+    return _BINARY_INT4.pack(len(encoded)) + encoded
+
+
+def _copy_binary_timestamp(value):
+    return _BINARY_BIGINT.pack(8, (value - _POSTGRES_EPOCH) // _MICROSECOND)
+
+
+def _copy_binary_uuid(value):
+    return _BINARY_UUID_LENGTH + uuid.UUID(value).bytes
+
+
+def _copy_binary_double(value):
+    double = float(value)
+    ## `float` quietly turns numbers beyond the range of a double into infinity
+    if math.isinf(double) and value != double:
+        raise OverflowError('{} is out of range for type double precision'.format(value))
+    return _BINARY_DOUBLE.pack(8, double)
+
+
+## `pg_type` oid -> `COPY ... (FORMAT binary)` field serializer
+_COPY_BINARY_SERIALIZERS = {
+    16: partial(_BINARY_BOOLEAN.pack, 1),  # boolean
+    20: partial(_BINARY_BIGINT.pack, 8),  # bigint
+    25: _copy_binary_text,  # text
+    701: _copy_binary_double,  # double precision
+    1043: _copy_binary_text,  # character varying
+    1184: _copy_binary_timestamp,  # timestamp with time zone
+    2950: _copy_binary_uuid  # uuid
+}
+
+
+def _copy_binary_row(field_count, serializers, columns, row):
+    fields = [field_count]
+    try:
+        for serialize, value in zip(serializers, row):
+            fields.append(COPY_BINARY_NULL if value is None else serialize(value))
+    except (OverflowError, ValueError, struct.error) as ex:
+        ## `fields` holds the field count, and each field serialized before the failing one
+        column = columns[len(fields) - 1]
+        raise PostgresError('Value `{}` cannot be written to column `{}`: {}'.format(value, column, ex)) from ex
+    return b''.join(fields)
+
+
+def _copy_csv_value(value):
+    if value is None:
+        return RESERVED_NULL_DEFAULT
+    if isinstance(value, datetime):
+        return arrow.get(value).format('YYYY-MM-DD HH:mm:ss.SSSSZZ')
+    return value
+
+
+def _copy_csv_row(row):
+    with io.StringIO() as out:
+        csv.writer(out).writerow([_copy_csv_value(value) for value in row])
+        return out.getvalue()
+
+
 class TransformStream:
-    def __init__(self, fun):
-        self.fun = fun
+    """
+    File like object which lazily serializes `rows` with `serialize_row` for
+    `cursor.copy_expert`, framed by `header` and `trailer`.
+
+    Each call to `read` joins as many serialized rows as fit in `size`, rather than
+    returning one row at a time.
+
+    `cursor.copy_expert` only reports that `read` failed, so any exception raised while
+    producing or serializing rows is kept as `error` for the caller to re-raise.
+    """
+
+    def __init__(self, rows, serialize_row, header, trailer):
+        self.rows = iter(rows)
+        self.serialize_row = serialize_row
+        self.chunks = [header]
+        self.trailer = trailer
+        self.empty = header[:0]
+        self.error = None
+
+    def read(self, size=COPY_BUFFER_SIZE):
+        if size is None or size < 0:
+            size = COPY_BUFFER_SIZE
+
+        chunks = self.chunks
+        serialize_row = self.serialize_row
+        length = 0
+        try:
+            for row in self.rows:
+                chunk = serialize_row(row)
+                chunks.append(chunk)
+                length += len(chunk)
+                if length >= size:
+                    break
+            else:
+                if self.trailer is not None:
+                    chunks.append(self.trailer)
+                    self.trailer = None
+        except Exception as ex:
+            self.error = ex
+            raise
 
-    def read(self, *args, **kwargs):
-        return self.fun()
+        data = self.empty.join(chunks)
+        chunks.clear()
+
+        return data
 
 
 class PostgresTarget(SQLInterface):
@@ -134,6 +311,8 @@ class PostgresTarget(SQLInterface):
         self.postgres_schema = postgres_schema
         self.persist_empty_tables = persist_empty_tables
         self.add_upsert_indexes = add_upsert_indexes
+        self._merge_sql_cache = OrderedDict()
+        self._reset_table_caches(enabled=False)
 
         if self.persist_empty_tables:
             self.LOGGER.debug('PostgresTarget is persisting empty tables')
@@ -234,6 +413,28 @@ class PostgresTarget(SQLInterface):
             if table_path:
                 self.table_mapping_cache[tuple(table_path)] = mapped_name
 
+    def _reset_table_caches(self, enabled):
+        """
+        Remote table schemas, metadata, and emptiness are cached for the duration of a `write_batch`,
+        within which this class makes every change to them. Outside of it, nothing is cached.
+        :param enabled: boolean
+        :return: None
+        """
+        if enabled:
+            self._table_schema_cache = {}
+            self._table_metadata_cache = {}
+            self._table_empty_cache = {}
+        else:
+            self._table_schema_cache = None
+            self._table_metadata_cache = None
+            self._table_empty_cache = None
+
+    def _invalidate_table_caches(self, table_name):
+        if self._table_schema_cache is not None:
+            self._table_schema_cache.pop(table_name, None)
+            self._table_metadata_cache.pop(table_name, None)
+            self._table_empty_cache.pop(table_name, None)
+
     def write_batch(self, stream_buffer):
         if not self.persist_empty_tables and stream_buffer.count == 0:
             return None
@@ -242,6 +443,8 @@ class PostgresTarget(SQLInterface):
             try:
                 cur.execute('BEGIN;')
 
+                self._reset_table_caches(enabled=True)
+
                 self.setup_table_mapping_cache(cur)
 
                 root_table_name = self.add_table_mapping_helper((stream_buffer.stream,), self.table_mapping_cache)['to']
@@ -316,6 +519,8 @@ class PostgresTarget(SQLInterface):
                 message = 'Exception writing records'
                 self.LOGGER.exception(message)
                 raise PostgresError(message, ex)
+            finally:
+                self._reset_table_caches(enabled=False)
 
     def activate_version(self, stream_buffer, version):
         with self.conn.cursor() as cur:
@@ -423,15 +628,14 @@ class PostgresTarget(SQLInterface):
     def add_table(self, cur, path, name, metadata):
         self._validate_identifier(name)
 
-        create_table_sql = sql.SQL('CREATE TABLE {}.{}').format(
-            sql.Identifier(self.postgres_schema),
-            sql.Identifier(name))
-
-        cur.execute(sql.SQL('{} ();').format(create_table_sql))
-
-        self._set_table_metadata(cur, name, {'path': path,
+        ## Create the table and set its metadata in a single round-trip
+        cur.execute(sql.SQL('CREATE TABLE {schema}.{table} (); COMMENT ON TABLE {schema}.{table} IS {metadata};').format(
+            schema=sql.Identifier(self.postgres_schema),
+            table=sql.Identifier(name),
+            metadata=sql.Literal(json.dumps({'path': path,
                                              'version': metadata.get('version', None),
-                                             'schema_version': metadata['schema_version']})
+                                             'schema_version': metadata['schema_version']}))))
+        self._invalidate_table_caches(name)
 
     def add_table_mapping(self, cur, from_path, metadata):
         mapping = self.add_table_mapping_helper(from_path, self.table_mapping_cache)
@@ -442,19 +646,60 @@ class PostgresTarget(SQLInterface):
         return mapping['to']
 
     def _get_update_sql(self, target_table_name, temp_table_name, key_properties, columns, subkeys):
-        full_table_name = sql.SQL('{}.{}').format(
-            sql.Identifier(self.postgres_schema),
-            sql.Identifier(target_table_name))
-        full_temp_table_name = sql.SQL('{}.{}').format(
-            sql.Identifier(self.postgres_schema),
-            sql.Identifier(temp_table_name))
+        ## The merge SQL only depends upon the shape of the table, so it is composed once per shape
+        ## and only the table names are filled in per call
+        shape = (tuple(key_properties), tuple(columns), tuple(subkeys))
+        template = self._merge_sql_cache.get(shape)
+        if template is None:
+            template = self._merge_sql_cache[shape] = self._get_update_sql_template(key_properties,
+                                                                                    columns,
+                                                                                    subkeys)
+            if len(self._merge_sql_cache) > MERGE_SQL_CACHE_SIZE:
+                self._merge_sql_cache.popitem(last=False)
+        else:
+            self._merge_sql_cache.move_to_end(shape)
+
+        return template.format(
+            table=sql.SQL('{}.{}').format(
+                sql.Identifier(self.postgres_schema),
+                sql.Identifier(target_table_name)),
+            temp_table=sql.SQL('{}.{}').format(
+                sql.Identifier(self.postgres_schema),
+                sql.Identifier(temp_table_name)))
+
+    def _get_update_sql_template(self, key_properties, columns, subkeys):
+        """
+        Compose the merge SQL for a table shape, leaving `{table}` and `{temp_table}` to be
+        filled in with `format`.
+        """
+        full_table_name = sql.SQL('{table}')
+        full_temp_table_name = sql.SQL('{temp_table}')
+
+        ## Braces within identifiers must survive the final `format`
+        def identifier(name):
+            return sql.SQL(sql.Identifier(name).as_string(self.conn).replace('{', '{{').replace('}', '}}'))
+
+        ## Without key properties there is nothing to deduplicate or replace, so rows are copied straight over
+        if not key_properties:
+            insert_columns = sql.SQL(', ').join(map(identifier, columns))
+            update_sql = sql.SQL('''
+                INSERT INTO {table}({insert_columns}) (
+                    SELECT {insert_columns}
+                    FROM {temp_table}
+                );
+                DROP TABLE {temp_table};
+                ''').format(table=full_table_name,
+                            temp_table=full_temp_table_name,
+                            insert_columns=insert_columns)
+
+            return sql.SQL(update_sql.as_string(self.conn))
 
         pk_temp_select_list = []
         pk_where_list = []
         pk_null_list = []
         cxt_where_list = []
         for pk in key_properties:
-            pk_identifier = sql.Identifier(pk)
+            pk_identifier = identifier(pk)
             pk_temp_select_list.append(sql.SQL('{}.{}').format(full_temp_table_name,
                                                                pk_identifier))
 
@@ -479,26 +724,26 @@ class PostgresTarget(SQLInterface):
         cxt_where = sql.SQL(' AND ').join(cxt_where_list)
 
         sequence_join = sql.SQL(' AND "dedupped".{} >= {}.{}').format(
-            sql.Identifier(singer.SEQUENCE),
+            identifier(singer.SEQUENCE),
             full_table_name,
-            sql.Identifier(singer.SEQUENCE))
+            identifier(singer.SEQUENCE))
 
         distinct_order_by = sql.SQL(' ORDER BY {}, {}.{} DESC').format(
             pk_temp_select,
             full_temp_table_name,
-            sql.Identifier(singer.SEQUENCE))
+            identifier(singer.SEQUENCE))
 
         if len(subkeys) > 0:
             pk_temp_subkey_select_list = []
             for pk in (key_properties + subkeys):
                 pk_temp_subkey_select_list.append(sql.SQL('{}.{}').format(full_temp_table_name,
-                                                                          sql.Identifier(pk)))
+                                                                          identifier(pk)))
             insert_distinct_on = sql.SQL(', ').join(pk_temp_subkey_select_list)
 
             insert_distinct_order_by = sql.SQL(' ORDER BY {}, {}.{} DESC').format(
                 insert_distinct_on,
                 full_temp_table_name,
-                sql.Identifier(singer.SEQUENCE))
+                identifier(singer.SEQUENCE))
         else:
             insert_distinct_on = pk_temp_select
             insert_distinct_order_by = distinct_order_by
@@ -506,13 +751,13 @@ class PostgresTarget(SQLInterface):
         insert_columns_list = []
         dedupped_columns_list = []
         for column in columns:
-            insert_columns_list.append(sql.SQL('{}').format(sql.Identifier(column)))
-            dedupped_columns_list.append(sql.SQL('{}.{}').format(sql.Identifier('dedupped'),
-                                                                 sql.Identifier(column)))
+            insert_columns_list.append(sql.SQL('{}').format(identifier(column)))
+            dedupped_columns_list.append(sql.SQL('{}.{}').format(identifier('dedupped'),
+                                                                 identifier(column)))
         insert_columns = sql.SQL(', ').join(insert_columns_list)
         dedupped_columns = sql.SQL(', ').join(dedupped_columns_list)
 
-        return sql.SQL('''
+        update_sql = sql.SQL('''
             DELETE FROM {table} USING (
                     SELECT "dedupped".*
                     FROM (
@@ -549,13 +794,114 @@ class PostgresTarget(SQLInterface):
                         insert_columns=insert_columns,
                         dedupped_columns=dedupped_columns)
 
+        return sql.SQL(update_sql.as_string(self.conn))
+
     def serialize_table_record_null_value(self, remote_schema, streamed_schema, field, value):
-        if value is None:
-            return RESERVED_NULL_DEFAULT
+        ## `None` is written as `COPY_NULL` when the rows are streamed to `COPY`
         return value
 
     def serialize_table_record_datetime_value(self, remote_schema, streamed_schema, field, value):
-        return _format_datetime(value)
+        return _parse_datetime(value)
+
+    def persist_rows(self,
+                     cur,
+                     remote_schema,
+                     temp_table_name,
+                     columns,
+                     rows):
+
+        full_temp_table_name = sql.SQL('{}.{}').format(
+            sql.Identifier(self.postgres_schema),
+            sql.Identifier(temp_table_name))
+        temp_table_columns = sql.SQL('{} ({})').format(
+            full_temp_table_name,
+            sql.SQL(', ').join(map(sql.Identifier, columns)))
+
+        ## Create temp table to upload new data to
+        create_sql = sql.SQL('CREATE TABLE {} (LIKE {}.{});').format(
+            full_temp_table_name,
+            sql.Identifier(self.postgres_schema),
+            sql.Identifier(remote_schema['name']))
+
+        subkeys = [column for column in columns if _SUBKEY_PATTERN.match(column)]
+
+        canonicalized_key_properties = [self.fetch_column_from_path((key_property,), remote_schema)[0]
+                                        for key_property in remote_schema['key_properties']]
+
+        update_sql = self._get_update_sql(remote_schema['name'],
+                                          temp_table_name,
+                                          canonicalized_key_properties,
+                                          columns,
+                                          subkeys)
+
+        rows = iter(rows)
+        first_rows = list(islice(rows, INSERT_ROWS_THRESHOLD))
+
+        if not first_rows:
+            cur.execute(sql.SQL('{} {}').format(create_sql, update_sql))
+            rows_persisted = 0
+
+        elif len(first_rows) < INSERT_ROWS_THRESHOLD:
+            ## Create, fill, and merge the temp table in a single round-trip. `execute_values`
+            ## treats the statement as a format string, so any `%` outside of `VALUES` is escaped.
+            def escaped(composable):
+                return sql.SQL(composable.as_string(cur).replace('%', '%%'))
+
+            execute_values(cur,
+                           sql.SQL('{} INSERT INTO {} VALUES %s; {}').format(escaped(create_sql),
+                                                                            escaped(temp_table_columns),
+                                                                            escaped(update_sql)),
+                           first_rows,
+                           page_size=INSERT_ROWS_THRESHOLD)
+            rows_persisted = len(first_rows)
+
+        else:
+            cur.execute(sql.SQL('{} SELECT {} FROM {} LIMIT 0;').format(
+                create_sql,
+                sql.SQL(', ').join(map(sql.Identifier, columns)),
+                full_temp_table_name))
+            column_types = [column.type_code for column in cur.description]
+
+            ## Use the binary format when every column type has a serializer, skipping all
+            ## text formatting and parsing of values. Otherwise fall back to the text format.
+            serializers = [_COPY_BINARY_SERIALIZERS.get(column_type) for column_type in column_types]
+
+            ## Binary text fields are read in the client encoding, as psycopg2 encodes any other text
+            copy_binary_text = partial(_copy_binary_text, encodings[cur.connection.encoding])
+            serializers = [copy_binary_text if serializer is _copy_binary_text else serializer
+                           for serializer in serializers]
+
+            if all(serializers):
+                copy_format = 'binary'
+                stream = TransformStream(chain(first_rows, rows),
+                                         partial(_copy_binary_row,
+                                                 _BINARY_INT2.pack(len(columns)),
+                                                 serializers,
+                                                 columns),
+                                         COPY_BINARY_HEADER,
+                                         COPY_BINARY_TRAILER)
+            else:
+                copy_format = 'text'
+                stream = TransformStream(chain(first_rows, rows), _copy_text_row, '', '')
+
+            copy = sql.SQL('COPY {} FROM STDIN WITH (FORMAT {})').format(
+                temp_table_columns,
+                sql.SQL(copy_format))
+            try:
+                cur.copy_expert(copy, stream, size=COPY_BUFFER_SIZE)
+            except Exception:
+                ## Surface the original error, rather than the `COPY` failing because of it
+                if stream.error is not None:
+                    raise stream.error
+                raise
+            rows_persisted = cur.rowcount
+
+            cur.execute(update_sql)
+
+        if self._table_empty_cache is not None:
+            self._table_empty_cache.pop(remote_schema['name'], None)
+
+        return rows_persisted
 
     def persist_csv_rows(self,
                          cur,
@@ -563,6 +909,12 @@ class PostgresTarget(SQLInterface):
                          temp_table_name,
                          columns,
                          csv_rows):
+        """
+        Copy the CSV `csv_rows` into the existing temp table, and merge them into the remote table.
+
+        No longer called by this class, which writes rows with `persist_rows`. Kept as the hook for
+        subclasses which override it.
+        """
 
         copy = sql.SQL('COPY {}.{} ({}) FROM STDIN WITH CSV NULL AS {}').format(
             sql.Identifier(self.postgres_schema),
@@ -571,8 +923,7 @@ class PostgresTarget(SQLInterface):
             sql.Literal(RESERVED_NULL_DEFAULT))
         cur.copy_expert(copy, csv_rows)
 
-        pattern = re.compile(singer.LEVEL_FMT.format('[0-9]+'))
-        subkeys = list(filter(lambda header: re.match(pattern, header) is not None, columns))
+        subkeys = [column for column in columns if _SUBKEY_PATTERN.match(column)]
 
         canonicalized_key_properties = [self.fetch_column_from_path((key_property,), remote_schema)[0]
                                         for key_property in remote_schema['key_properties']]
@@ -587,80 +938,71 @@ class PostgresTarget(SQLInterface):
     def write_table_batch(self, cur, table_batch, metadata):
         remote_schema = table_batch['remote_schema']
 
-        ## Create temp table to upload new data to
-        target_table_name = self.canonicalize_identifier('tmp_' + str(uuid.uuid4()))
-        cur.execute(sql.SQL('''
-            CREATE TABLE {schema}.{temp_table} (LIKE {schema}.{table})
-        ''').format(
-            schema=sql.Identifier(self.postgres_schema),
-            temp_table=sql.Identifier(target_table_name),
-            table=sql.Identifier(remote_schema['name'])
-        ))
+        headers = list(remote_schema['schema']['properties'].keys())
 
-        ## Make streamable CSV records
-        csv_headers = list(remote_schema['schema']['properties'].keys())
-        rows_iter = iter(table_batch['records'])
+        target_table_name = self.canonicalize_identifier('tmp_' + str(uuid.uuid4()))
 
-        def transform():
-            try:
-                row = next(rows_iter)
+        ## Subclasses which override `persist_csv_rows` are still handed the rows as a CSV stream
+        if type(self).persist_csv_rows is not PostgresTarget.persist_csv_rows:
+            cur.execute(sql.SQL('CREATE TABLE {schema}.{temp_table} (LIKE {schema}.{table});').format(
+                schema=sql.Identifier(self.postgres_schema),
+                temp_table=sql.Identifier(target_table_name),
+                table=sql.Identifier(remote_schema['name'])))
 
-                with io.StringIO() as out:
-                    writer = csv.DictWriter(out, csv_headers)
-                    writer.writerow(row)
-                    return out.getvalue()
-            except StopIteration:
-                return ''
+            rows = list(table_batch['records'])
+            self.persist_csv_rows(cur,
+                                  remote_schema,
+                                  target_table_name,
+                                  headers,
+                                  TransformStream(rows, _copy_csv_row, '', ''))
 
-        csv_rows = TransformStream(transform)
+            if self._table_empty_cache is not None:
+                self._table_empty_cache.pop(remote_schema['name'], None)
 
-        ## Persist csv rows
-        self.persist_csv_rows(cur,
-                              remote_schema,
-                              target_table_name,
-                              csv_headers,
-                              csv_rows)
+            return len(rows)
 
-        return len(table_batch['records'])
+        ## Persist rows, streaming them straight into the temp table
+        return self.persist_rows(cur,
+                                 remote_schema,
+                                 target_table_name,
+                                 headers,
+                                 table_batch['records'])
 
     def add_column(self, cur, table_name, column_name, column_schema):
+        self.add_columns(cur, table_name, [(column_name, column_schema)])
 
-        cur.execute(sql.SQL('''
-            ALTER TABLE {table_schema}.{table_name}
-            ADD COLUMN {column_name} {data_type};
-        ''').format(
+    def add_columns(self, cur, table_name, columns):
+        ## A single `ALTER TABLE` adds every column
+        cur.execute(_ADD_COLUMNS_SQL.format(
             table_schema=sql.Identifier(self.postgres_schema),
             table_name=sql.Identifier(table_name),
-            column_name=sql.Identifier(column_name),
-            data_type=sql.SQL(self.json_schema_to_sql_type(column_schema))))
+            columns=sql.SQL(', ').join(
+                _ADD_COLUMN_SQL.format(
+                    column_name=sql.Identifier(column_name),
+                    data_type=sql.SQL(self.json_schema_to_sql_type(column_schema)))
+                for column_name, column_schema in columns)))
+        self._invalidate_table_caches(table_name)
 
     def migrate_column(self, cur, table_name, from_column, to_column):
-        cur.execute(sql.SQL('''
-            UPDATE {table_schema}.{table_name}
-            SET {to_column} = {from_column};
-        ''').format(
+        cur.execute(_MIGRATE_COLUMN_SQL.format(
             table_schema=sql.Identifier(self.postgres_schema),
             table_name=sql.Identifier(table_name),
             to_column=sql.Identifier(to_column),
             from_column=sql.Identifier(from_column)))
 
     def drop_column(self, cur, table_name, column_name):
-        cur.execute(sql.SQL('''
-            ALTER TABLE {table_schema}.{table_name}
-            DROP COLUMN {column_name};
-        ''').format(
+        cur.execute(_DROP_COLUMN_SQL.format(
             table_schema=sql.Identifier(self.postgres_schema),
             table_name=sql.Identifier(table_name),
             column_name=sql.Identifier(column_name)))
+        self._invalidate_table_caches(table_name)
 
     def make_column_nullable(self, cur, table_name, column_name):
-        cur.execute(sql.SQL('''
-            ALTER TABLE {table_schema}.{table_name}
-            ALTER COLUMN {column_name} DROP NOT NULL;
-        ''').format(
+        cur.execute(_MAKE_COLUMN_NULLABLE_SQL.format(
             table_schema=sql.Identifier(self.postgres_schema),
             table_name=sql.Identifier(table_name),
             column_name=sql.Identifier(column_name)))
+        self._invalidate_table_caches(table_name)
 
     def add_index(self, cur, table_name, column_names):
         index_name = 'tp_{}_{}_idx'.format(table_name, "_".join(column_names))
@@ -693,25 +1035,39 @@ class PostgresTarget(SQLInterface):
             sql.Identifier(table_name),
             sql.Literal(json.dumps(metadata))))
 
+        if self._table_metadata_cache is not None:
+            self._table_schema_cache.pop(table_name, None)
+            ## As it would be read back from the table's comment
+            self._table_metadata_cache[table_name] = json.loads(json.dumps(metadata))
+
     def _get_table_metadata(self, cur, table_name):
+        ## Callers modify the metadata returned to them, so the cached metadata is never handed out
+        if self._table_metadata_cache is None:
+            return self.__get_table_metadata(cur, table_name)
+
+        if not table_name in self._table_metadata_cache:
+            self._table_metadata_cache[table_name] = self.__get_table_metadata(cur, table_name)
+
+        return deepcopy(self._table_metadata_cache[table_name])
+
+    def __get_table_metadata(self, cur, table_name):
+        ## Check for the table and fetch its comment in a single round-trip
         cur.execute(sql.SQL('''
-            SELECT EXISTS (
-                SELECT 1 FROM pg_tables
-                WHERE schemaname = {} AND
-                      tablename = {});
+            SELECT obj_description(c.oid, 'pg_class')
+            FROM pg_namespace AS n
+                INNER JOIN pg_class AS c ON n.oid = c.relnamespace
+            WHERE n.nspname = {} AND
+                  c.relname = {} AND
+                  c.relkind IN ('r', 'p');
         ''').format(
             sql.Literal(self.postgres_schema),
             sql.Literal(table_name)))
-        table_exists = cur.fetchone()[0]
+        table = cur.fetchone()
 
-        if not table_exists:
+        if table is None:
             return None
 
-        cur.execute(
-            sql.SQL('SELECT description FROM pg_description WHERE objoid = {}::regclass;').format(
-                sql.Literal(
-                    '"{}"."{}"'.format(self.postgres_schema, table_name))))
-        comment = cur.fetchone()[0]
+        comment = table[0]
 
         if comment:
             try:
@@ -725,6 +1081,9 @@ class PostgresTarget(SQLInterface):
         return comment_meta
 
     def add_column_mapping(self, cur, table_name, from_path, to_name, mapped_schema):
+        self.add_column_mappings(cur, table_name, [(from_path, to_name, mapped_schema)])
+
+    def add_column_mappings(self, cur, table_name, mappings):
         metadata = self._get_table_metadata(cur, table_name)
 
         if not metadata:
@@ -733,13 +1092,14 @@ class PostgresTarget(SQLInterface):
         if not 'mappings' in metadata:
             metadata['mappings'] = {}
 
-        mapping = {'type': json_schema.get_type(mapped_schema),
-                   'from': from_path}
+        for from_path, to_name, mapped_schema in mappings:
+            mapping = {'type': json_schema.get_type(mapped_schema),
+                       'from': from_path}
 
-        if 't' == json_schema.shorthand(mapped_schema):
-            mapping['format'] = 'date-time'
+            if 't' == json_schema.shorthand(mapped_schema):
+                mapping['format'] = 'date-time'
 
-        metadata['mappings'][to_name] = mapping
+            metadata['mappings'][to_name] = mapping
 
         self._set_table_metadata(cur, table_name, metadata)
 
@@ -774,14 +1134,27 @@ class PostgresTarget(SQLInterface):
             return []
 
     def is_table_empty(self, cur, table_name):
+        if self._table_empty_cache is not None and table_name in self._table_empty_cache:
+            return self._table_empty_cache[table_name]
+
         cur.execute(sql.SQL('SELECT EXISTS (SELECT * FROM {}.{});').format(
             sql.Identifier(self.postgres_schema),
             sql.Identifier(table_name)))
+        table_empty = not cur.fetchall()[0][0]
 
-        return not cur.fetchall()[0][0]
+        if self._table_empty_cache is not None:
+            self._table_empty_cache[table_name] = table_empty
+
+        return table_empty
 
     def get_table_schema(self, cur, name):
-        return self.__get_table_schema(cur, name)
+        if self._table_schema_cache is None:
+            return self.__get_table_schema(cur, name)
+
+        if not name in self._table_schema_cache:
+            self._table_schema_cache[name] = self.__get_table_schema(cur, name)
+
+        return self._table_schema_cache[name]
 
     def __get_table_schema(self, cur, name):
         # Purely exists for migration purposes. DO NOT CALL DIRECTLY
@@ -162,9 +162,15 @@ class BufferedSingerStream():
         return self.__buffer
 
     def get_batch(self):
-        current_time = arrow.get().format('YYYY-MM-DD HH:mm:ss.SSSSZZ')
+        ## Read the clock once per batch, rather than once per record
+        current_time = arrow.get()
+        batched_at = current_time.format('YYYY-MM-DD HH:mm:ss.SSSSZZ')
+        batch_sequence = current_time.int_timestamp
 
+        ## Records are processed in place within the buffer, so the batch only holds references to them
         records = []
+        append_record = records.append
+        use_uuid_pk = self.use_uuid_pk
         for record_message in self.peek_buffer():
             record = record_message['record']
 
@@ -174,17 +180,17 @@ class BufferedSingerStream():
             if 'time_extracted' in record_message and record.get(singer.RECEIVED_AT) is None:
                 record[singer.RECEIVED_AT] = record_message['time_extracted']
 
-            if self.use_uuid_pk and record.get(singer.PK) is None:
+            if use_uuid_pk and record.get(singer.PK) is None:
                 record[singer.PK] = str(uuid.uuid4())
 
-            record[singer.BATCHED_AT] = current_time
+            record[singer.BATCHED_AT] = batched_at
 
             if 'sequence' in record_message:
                 record[singer.SEQUENCE] = record_message['sequence']
             else:
-                record[singer.SEQUENCE] = arrow.get().int_timestamp
+                record[singer.SEQUENCE] = batch_sequence
 
-            records.append(record)
+            append_record(record)
 
         return records
 
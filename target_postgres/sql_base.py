@@ -13,8 +13,6 @@
 #
 
 from copy import deepcopy
-from functools import lru_cache, partial
-import pickle
 import time
 
 import singer
@@ -27,6 +25,14 @@ SEPARATOR = '__'
 CURRENT_SCHEMA_VERSION = 2
 
 
+## How a streamed column compares to the remote columns for the same path
+_COLUMN_UNCHANGED = 'unchanged'
+_COLUMN_NEW = 'new'
+_COLUMN_MAKE_NULLABLE = 'make_nullable'
+_COLUMN_FIRST_MULTI_TYPE = 'first_multi_type'
+_COLUMN_REST_MULTI_TYPE = 'rest_multi_type'
+
+
 def _duration_millis(start):
     return int((time.monotonic() - start) * 1000)
 
@@ -35,6 +41,29 @@ def _mapping_name(field, schema):
     return field + SEPARATOR + json_schema.shorthand(schema)
 
 
+def _index_mappings(mappings):
+    """
+    Index `mappings` for canonicalizing column identifiers against.
+
+    :param mappings: [{'from': (path_0, ...), 'to': string, 'type': [...], ...}, ...]
+    :return: ({((path_0, ...), shorthand): to, ...}, {(path_0, ...), ...}, {to, ...})
+    """
+    mappings_index = ({}, set(), set())
+
+    for m in mappings:
+        _add_to_mappings_index(mappings_index, m)
+
+    return mappings_index
+
+
+def _add_to_mappings_index(mappings_index, mapping):
+    from_type__to_name, existing_paths, existing_column_names = mappings_index
+
+    from_type__to_name[(mapping['from'], json_schema.shorthand(mapping))] = mapping['to']
+    existing_paths.add(mapping['from'])
+    existing_column_names.add(mapping['to'])
+
+
 class SQLInterface:
     """
     Generic interface for handling SQL Targets in Singer.
@@ -154,21 +183,20 @@ class SQLInterface:
 
         raise Exception('blahbittyblah')
 
-    def _canonicalize_column_identifier(self, path, schema, mappings):
-        """"""
+    def _canonicalize_column_identifier(self, path, schema, mappings, mappings_index=None):
+        """
+        :param mappings_index: `_index_mappings(mappings)`, when the caller already maintains it
+        """
 
-        from_type__to_name = {}
-        existing_paths = set()
-        existing_column_names = set()
+        if mappings_index is None:
+            mappings_index = _index_mappings(mappings)
 
-        for m in mappings:
-            from_type__to_name[(m['from'], json_schema.shorthand(m))] = m['to']
-            existing_paths.add(m['from'])
-            existing_column_names.add(m['to'])
+        from_type__to_name, existing_paths, existing_column_names = mappings_index
 
         ## MAPPING EXISTS, NO CANONICALIZATION NECESSARY
-        if (path, json_schema.shorthand(schema)) in from_type__to_name:
-            return from_type__to_name[(path, json_schema.shorthand(schema))]
+        schema_shorthand = json_schema.shorthand(schema)
+        if (path, schema_shorthand) in from_type__to_name:
+            return from_type__to_name[(path, schema_shorthand)]
 
         raw_canonicalized_column_name = self.canonicalize_identifier(SEPARATOR.join(path))
         canonicalized_column_name = self.canonicalize_identifier(raw_canonicalized_column_name[:self.IDENTIFIER_FIELD_LENGTH])
@@ -176,7 +204,7 @@ class SQLInterface:
         raw_suffix = ''
         ## NO TYPE MATCH
         if path in existing_paths:
-            raw_suffix = SEPARATOR + json_schema.shorthand(schema)
+            raw_suffix = SEPARATOR + schema_shorthand
             canonicalized_column_name = self.canonicalize_identifier(
                                           raw_canonicalized_column_name[
                                             :self.IDENTIFIER_FIELD_LENGTH - len(raw_suffix)] + raw_suffix)
@@ -204,6 +232,40 @@ class SQLInterface:
 
         return canonicalized_column_name
 
+    def _column_change(self, column_schema, path_mappings):
+        """
+        Classify how `column_schema` compares to the existing `path_mappings` for its path.
+
+        :param column_schema: dict, JSON Schema
+        :param path_mappings: [{'from': (path_0, ...), 'to': string, 'type': [...], ...}, ...]
+        :return: one of the `_COLUMN_*` changes
+        """
+        if not path_mappings:
+            return _COLUMN_NEW
+
+        ## SCHEMAS MATCH
+        ## NULLABLE SCHEMAS MATCH
+        ##  New column _is not_ nullable, existing column _is_
+        column_sql_types = {self.json_schema_to_sql_type(column_schema),
+                            self.json_schema_to_sql_type(json_schema.make_nullable(column_schema))}
+        for m in path_mappings:
+            if self.json_schema_to_sql_type(m) in column_sql_types:
+                return _COLUMN_UNCHANGED
+
+        ## NULL COMPATIBILITY
+        ##  New column _is_ nullable, existing column is _not_
+        column_shorthand = json_schema.shorthand(column_schema)
+        for m in path_mappings:
+            if json_schema.shorthand(m) == column_shorthand:
+                return _COLUMN_MAKE_NULLABLE
+
+        ## FIRST MULTI TYPE
+        if 1 == len(path_mappings):
+            return _COLUMN_FIRST_MULTI_TYPE
+
+        ## REST MULTI TYPE
+        return _COLUMN_REST_MULTI_TYPE
+
     def add_table(self, connection, path, name, metadata):
         """
         Create the remote table schema.
@@ -283,6 +345,20 @@ class SQLInterface:
         """
         raise NotImplementedError('`add_column` not implemented.')
 
+    def add_columns(self, connection, table_name, columns):
+        """
+        Add each column `(name, schema)` of `columns` in `table_name`.
+
+        Base implementation adds each column with `add_column`. Override to add them all at once.
+
+        :param connection: remote connection, type left to be determined by implementing class
+        :param table_name: string
+        :param columns: [(string, JSON Object Schema), ...]
+        :return: None
+        """
+        for name, schema in columns:
+            self.add_column(connection, table_name, name, schema)
+
     def drop_column(self, connection, table_name, name):
         """
         Drop column `name` in `table_name`.
@@ -349,6 +425,20 @@ class SQLInterface:
         """
         raise NotImplementedError('`add_column_mapping` not implemented.')
 
+    def add_column_mappings(self, connection, table_name, mappings):
+        """
+        Add each column mapping `(from_path, to_name, schema)` of `mappings`, as per `add_column_mapping`.
+
+        Base implementation adds each mapping with `add_column_mapping`. Override to add them all at once.
+
+        :param connection: remote connection, type left to be determined by implementing class
+        :param table_name: string
+        :param mappings: [((string, ...), string, JSON Object Schema), ...]
+        :return: None
+        """
+        for from_path, to_name, schema in mappings:
+            self.add_column_mapping(connection, table_name, from_path, to_name, schema)
+
     def drop_column_mapping(self, connection, table_name, name):
         """
         Given column mapping `name`, remove from the TABLE_SCHEMA(remote).
@@ -361,9 +451,16 @@ class SQLInterface:
         raise NotImplementedError('`remove_column_mapping` not implemented.')
 
     def _get_mapping(self, existing_schema, path, schema):
+        ## Checked against every mapping of the table, so the cheapest comparisons are made first:
+        ##  the last element of the path rules out nearly all other columns without copying their paths
+        schema_shorthand = json_schema.shorthand(schema)
+        last_path_element = path[-1]
+
         for to, mapping in existing_schema.get('mappings', {}).items():
-            if tuple(mapping['from']) == path \
-                    and json_schema.shorthand(mapping) == json_schema.shorthand(schema):
+            mapping_from = mapping['from']
+            if mapping_from[-1] == last_path_element \
+                    and tuple(mapping_from) == path \
+                    and json_schema.shorthand(mapping) == schema_shorthand:
                 return to
 
         return None
@@ -405,6 +502,18 @@ class SQLInterface:
 
             self.add_key_properties(connection, table_name, schema.get('key_properties', None))
 
+            ## Streams commonly upsert the same schema against the same remote schema batch after batch
+            ##  {table_name: (streamed properties, remote mappings)} last found to require no changes to
+            ##  the remote. Created here, as subclasses are not required to call `SQLInterface.__init__`
+            unchanged_table_schemas = getattr(self, '_unchanged_table_schemas', None)
+            if unchanged_table_schemas is None:
+                unchanged_table_schemas = self._unchanged_table_schemas = {}
+
+            unchanged_table_schema = (repr(schema['schema']['properties']),
+                                      repr(existing_schema.get('mappings', {})))
+            if existing_table and unchanged_table_schemas.get(table_name) == unchanged_table_schema:
+                return existing_schema
+
             ## Build up mappings to compare new columns against existing
             mappings = []
 
@@ -428,15 +537,65 @@ class SQLInterface:
                 if not m['from'] in column_paths_seen:
                     single_type_columns.append((m['from'], json_schema.make_nullable(m)))
 
+            ## Index the mappings by path once, rather than searching all mappings for every column
+            mappings_by_path = {}
+            for m in mappings:
+                mappings_by_path.setdefault(m['from'], []).append(m)
+
+            ## Index of the mappings' paths and names to canonicalize new columns against. Kept up
+            ##  to date as new columns are added, and rebuilt lazily after any other change to `mappings`
+            mappings_index = None
+
+            ## Column comparisons only depend upon the type and format of the column and of the
+            ##  existing mappings for its path, of which there are only a handful of combinations
+            column_changes = {}
+
+            def type_key(schema):
+                return (tuple(json_schema.get_type(schema)), schema.get('format'))
+
+            def column_change(column_schema, path_mappings):
+                key = (type_key(column_schema), tuple(type_key(m) for m in path_mappings))
+                if not key in column_changes:
+                    column_changes[key] = self._column_change(column_schema, path_mappings)
+                return column_changes[key]
+
+            ## New columns are added together, either once all columns are processed or before
+            ## any other change is made to the table
+            new_columns = []
+
+            def add_new_columns():
+                if new_columns:
+                    self.add_columns(connection,
+                                     table_name,
+                                     [(name, column_schema) for _, name, column_schema in new_columns])
+                    self.add_column_mappings(connection, table_name, new_columns)
+                    del new_columns[:]
+
             ## Process new columns against existing
-            table_empty = self.is_table_empty(connection, table_name)
+            ##  A table we have just created is trivially empty
+            table_empty = not existing_table or self.is_table_empty(connection, table_name)
 
             for column_path, column_schema in single_type_columns:
                 upsert_table_helper__start__column = time.monotonic()
 
-                canonicalized_column_name = self._canonicalize_column_identifier(column_path, column_schema, mappings)
+                path_mappings = mappings_by_path.get(column_path, [])
+                change = column_change(column_schema, path_mappings)
+
+                ## EXISTING COLUMNS
+                ##  Columns which already match are by far the most common, so are skipped before any other work
+                if change == _COLUMN_UNCHANGED:
+                    continue
+
                 nullable_column_schema = json_schema.make_nullable(column_schema)
 
+                if mappings_index is None:
+                    mappings_index = _index_mappings(mappings)
+
+                canonicalized_column_name = self._canonicalize_column_identifier(column_path,
+                                                                                 column_schema,
+                                                                                 mappings,
+                                                                                 mappings_index)
+
                 def log_message(msg):
                     if log_schema_changes:
                         self.LOGGER.info(
@@ -448,7 +607,7 @@ class SQLInterface:
                                 _duration_millis(upsert_table_helper__start__column)))
 
                 ## NEW COLUMN
-                if not column_path in [m['from'] for m in mappings]:
+                if change == _COLUMN_NEW:
                     upsert_table_helper__column = "New column"
                     ### NON EMPTY TABLE
                     if not table_empty:
@@ -459,44 +618,27 @@ class SQLInterface:
                                 table_name))
                         column_schema = nullable_column_schema
 
-                    self.add_column(connection,
-                                    table_name,
-                                    canonicalized_column_name,
-                                    column_schema)
-                    self.add_column_mapping(connection,
-                                            table_name,
-                                            column_path,
-                                            canonicalized_column_name,
-                                            column_schema)
+                    new_columns.append((column_path, canonicalized_column_name, column_schema))
 
                     mapping = json_schema.simple_type(column_schema)
                     mapping['from'] = column_path
                     mapping['to'] = canonicalized_column_name
                     mappings.append(mapping)
+                    mappings_by_path[column_path] = [mapping]
+                    _add_to_mappings_index(mappings_index, mapping)
 
                     log_message(upsert_table_helper__column)
 
                     continue
 
                 ## EXISTING COLUMNS
-                ### SCHEMAS MATCH
-                if [True for m in mappings if
-                    m['from'] == column_path
-                    and self.json_schema_to_sql_type(m) == self.json_schema_to_sql_type(column_schema)]:
-                    continue
-                ### NULLABLE SCHEMAS MATCH
-                ###  New column _is not_ nullable, existing column _is_
-                if [True for m in mappings if
-                    m['from'] == column_path
-                    and self.json_schema_to_sql_type(m) == self.json_schema_to_sql_type(nullable_column_schema)]:
-                    continue
+                add_new_columns()
 
                 ### NULL COMPATIBILITY
                 ###  New column _is_ nullable, existing column is _not_
-                non_null_original_column = [m for m in mappings if
-                                            m['from'] == column_path and json_schema.shorthand(
-                                                m) == json_schema.shorthand(column_schema)]
-                if non_null_original_column:
+                if change == _COLUMN_MAKE_NULLABLE:
+                    column_shorthand = json_schema.shorthand(column_schema)
+
                     ## MAKE NULLABLE
                     self.make_column_nullable(connection,
                                               table_name,
@@ -509,12 +651,14 @@ class SQLInterface:
                                             nullable_column_schema)
 
                     mappings = [m for m in mappings if not (m['from'] == column_path and json_schema.shorthand(
-                        m) == json_schema.shorthand(column_schema))]
+                        m) == column_shorthand)]
 
                     mapping = json_schema.simple_type(nullable_column_schema)
                     mapping['from'] = column_path
                     mapping['to'] = canonicalized_column_name
                     mappings.append(mapping)
+                    mappings_by_path[column_path] = [m for m in mappings if m['from'] == column_path]
+                    mappings_index = None
 
                     log_message("Made existing column nullable.")
 
@@ -522,10 +666,8 @@ class SQLInterface:
 
                 ### FIRST MULTI TYPE
                 ###  New column matches existing column path, but the types are incompatible
-                duplicate_paths = [m for m in mappings if m['from'] == column_path]
-
-                if 1 == len(duplicate_paths):
-                    existing_mapping = duplicate_paths[0]
+                if change == _COLUMN_FIRST_MULTI_TYPE:
+                    existing_mapping = path_mappings[0]
                     existing_column_name = existing_mapping['to']
 
                     if existing_column_name:
@@ -592,7 +734,7 @@ class SQLInterface:
                     )
 
                 ## REST MULTI TYPE
-                elif 1 < len(duplicate_paths):
+                elif change == _COLUMN_REST_MULTI_TYPE:
                     ## Add new column
                     self.add_column_mapping(connection,
                                             table_name,
@@ -622,13 +764,25 @@ class SQLInterface:
                             table_name
                         ))
 
+                mappings_by_path[column_path] = [m for m in mappings if m['from'] == column_path]
+                mappings_index = None
+
                 log_message(upsert_table_helper__column)
 
+            add_new_columns()
+
             if not existing_table:
                 for column_names in self.new_table_indexes(schema):
                     self.add_index(connection, table_name, column_names)
 
-            return self._get_table_schema(connection, table_name)
+            remote_schema = self._get_table_schema(connection, table_name)
+
+            if existing_table and repr(remote_schema.get('mappings', {})) == unchanged_table_schema[1]:
+                unchanged_table_schemas[table_name] = unchanged_table_schema
+            else:
+                unchanged_table_schemas.pop(table_name, None)
+
+            return remote_schema
 
     def _serialize_table_record_field_name(self, remote_schema, path, value_json_schema_tuple):
         """
@@ -706,77 +860,86 @@ class SQLInterface:
         """
         Parse the given table's `records` in preparation for persistence to the remote target.
 
-        Base implementation returns a list of dictionaries, where _every_ dictionary has the
-        same keys as `remote_schema`'s properties.
+        Base implementation yields a list per record, where _every_ list holds one value per
+        `remote_schema` property, in the order of `remote_schema`'s properties. Rows are yielded
+        lazily so that they can be streamed to the remote without materializing the whole table.
 
         :param remote_schema: TABLE_SCHEMA(remote)
         :param streamed_schema: TABLE_SCHEMA(local)
         :param records: [{(path_0, path_1, ...): (_json_schema_string_type, value), ...}, ...]
-        :return: [{...}, ...]
+        :return: generator of [...]
         """
 
-        datetime_paths = set()
-        default_paths = {}
-
+        ## Plan how each streamed path is serialized once, rather than per record:
+        ##  (path, is datetime, default value, default value's type, {value type: field index})
+        plan = []
         for column_path, column_schema in streamed_schema['schema']['properties'].items():
+            is_datetime = False
+            default = None
             for sub_schema in column_schema['anyOf']:
                 if json_schema.is_datetime(sub_schema):
-                    datetime_paths.add(column_path)
+                    is_datetime = True
                 if sub_schema.get('default') is not None:
-                    default_paths[column_path] = sub_schema.get('default')
+                    default = sub_schema.get('default')
+
+            default_type = None if default is None else json_schema.python_type(default)
+            plan.append((column_path, is_datetime, default, default_type, {}))
 
         ## Get the default NULL value so we can assign row values when value is _not_ NULL
         NULL_DEFAULT = self.serialize_table_record_null_value(remote_schema, streamed_schema, None, None)
 
-        serialized_rows = []
+        remote_fields = list(remote_schema['schema']['properties'].keys())
+        field_indexes = dict([(field, i) for i, field in enumerate(remote_fields)])
+        default_row = [NULL_DEFAULT] * len(remote_fields)
 
-        remote_fields = set(remote_schema['schema']['properties'].keys())
-        default_row = dict([(field, NULL_DEFAULT) for field in remote_fields])
-
-        paths = streamed_schema['schema']['properties'].keys()
-
-        ## create a partial function with only hashable args so we can use lru_cache on it
-        _cached_field_name = partial(self._serialize_table_record_field_name, remote_schema)
-        cached_field_name = lru_cache(maxsize=None)(_cached_field_name)
+        ## The serializer methods are bound once per batch, rather than once for every field of every row
+        STRING = json_schema.STRING
+        DATE_TIME_FORMAT = json_schema.DATE_TIME_FORMAT
+        serialize_datetime_value = self.serialize_table_record_datetime_value
+        serialize_null_value = self.serialize_table_record_null_value
 
         for record in records:
 
-            ## pickling/unpickling is much faster than deepcopy
-            row = pickle.loads(pickle.dumps(default_row))
+            ## values are literals, so a shallow copy suffices
+            row = default_row.copy()
 
-            for path in paths:
+            for path, is_datetime, default, default_type, field_indexes_by_type in plan:
                 json_schema_string_type, value = record.get(path, (None, None))
 
                 ## Serialize fields which are not present but have default values set
-                if path in default_paths \
-                        and value is None:
-                    value = default_paths[path]
-                    json_schema_string_type = json_schema.python_type(value)
+                if value is None and default is not None:
+                    value = default
+                    json_schema_string_type = default_type
 
                 if not json_schema_string_type:
                     continue
 
                 ## Serialize datetime to compatible format
-                if path in datetime_paths \
-                        and json_schema_string_type == json_schema.STRING \
+                if is_datetime \
+                        and json_schema_string_type == STRING \
                         and value is not None:
-                    value = self.serialize_table_record_datetime_value(remote_schema, streamed_schema, path,
-                                                                       value)
-                    value_json_schema_tuple = (json_schema.STRING, json_schema.DATE_TIME_FORMAT)
-                    field_name = cached_field_name(path, value_json_schema_tuple)
-                else:
-                    field_name = cached_field_name(path, (json_schema_string_type,))
+                    value = serialize_datetime_value(remote_schema, streamed_schema, path, value)
+                    json_schema_string_type = DATE_TIME_FORMAT
+
+                field_index = field_indexes_by_type.get(json_schema_string_type)
+                if field_index is None:
+                    if json_schema_string_type == DATE_TIME_FORMAT:
+                        value_json_schema_tuple = (STRING, DATE_TIME_FORMAT)
+                    else:
+                        value_json_schema_tuple = (json_schema_string_type,)
+                    field_index = field_indexes[
+                        self._serialize_table_record_field_name(remote_schema, path, value_json_schema_tuple)]
+                    field_indexes_by_type[json_schema_string_type] = field_index
 
                 ## Serialize NULL default value
-                value = self.serialize_table_record_null_value(remote_schema, streamed_schema, path, value)
-
-                ## `field_name` is unset
-                if row[field_name] == NULL_DEFAULT:
-                    row[field_name] = value
+                if value is None:
+                    value = serialize_null_value(remote_schema, streamed_schema, path, value)
 
-            serialized_rows.append(row)
+                ## field is unset, ie still holds the very NULL_DEFAULT the row was filled with
+                if row[field_index] is NULL_DEFAULT:
+                    row[field_index] = value
 
-        return serialized_rows
+            yield row
 
     def write_table_batch(self, connection, table_batch, metadata):
         """
@@ -785,7 +948,7 @@ class SQLInterface:
 
         :param connection: remote connection, type left to be determined by implementing class
         :param table_batch: {'remote_schema': TABLE_SCHEMA(remote),
-                             'records': [{...}, ...]}
+                             'records': iterable of [...]}
         :param metadata: additional metadata needed by implementing class
         :return: integer
         """
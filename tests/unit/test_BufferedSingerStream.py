@@ -1,6 +1,7 @@
 from decimal import Decimal
 from copy import deepcopy
 
+import arrow
 import pytest
 
 from target_postgres import singer
@@ -53,6 +54,39 @@ def test_init__empty_key_properties():
     assert [] == rows_missing_pk
 
 
+def test_get_batch__missing_sequence(monkeypatch):
+    ## A clock which advances every time it is read
+    clock_reads = []
+    arrow_get = arrow.get
+
+    def advancing_clock(*args, **kwargs):
+        if args or kwargs:
+            return arrow_get(*args, **kwargs)
+        clock_reads.append(None)
+        return arrow_get(1500000000 + len(clock_reads))
+
+    monkeypatch.setattr(arrow, 'get', advancing_clock)
+
+    singer_stream = BufferedSingerStream(CATS_SCHEMA['stream'],
+                                         CATS_SCHEMA['schema'],
+                                         CATS_SCHEMA['key_properties'])
+
+    stream = CatStream(100)
+    for _ in range(20):
+        record_message = stream.generate_record_message()
+        record_message.pop('sequence')
+        singer_stream.add_record_message(record_message)
+
+    del clock_reads[:]
+    batch = singer_stream.get_batch()
+
+    assert 20 == len(batch)
+    ## The clock is read once per batch, rather than once per record
+    assert 1 == len(clock_reads)
+    assert 1 == len(set(r[singer.SEQUENCE] for r in batch))
+    assert 1 == len(set(r[singer.BATCHED_AT] for r in batch))
+
+
 def test_add_record_message():
     stream = CatStream(10)
     singer_stream = BufferedSingerStream(CATS_SCHEMA['stream'],
@@ -165,16 +165,108 @@ def test_loading__invalid__configuration__schema(db_cleanup):
         main(CONFIG, input_stream=stream)
 
 
-def test_loading__invalid__default_null_value__non_nullable_column(db_cleanup):
-    class NullDefaultCatStream(CatStream):
+@pytest.mark.parametrize('record_count, copy_format, client_encoding',
+                         [(20, None, 'UTF8'),
+                          (postgres.INSERT_ROWS_THRESHOLD * 2, 'binary', 'UTF8'),
+                          (postgres.INSERT_ROWS_THRESHOLD * 2, 'text', 'UTF8'),
+                          (20, None, 'LATIN1'),
+                          (postgres.INSERT_ROWS_THRESHOLD * 2, 'binary', 'LATIN1')])
+def test_loading__null_literal_and_special_characters(db_cleanup,
+                                                      monkeypatch,
+                                                      record_count,
+                                                      copy_format,
+                                                      client_encoding):
+    bio = 'tab\there, new\nline, carriage\rreturn, \\N and a \\ backslash, café'
+    if client_encoding == 'UTF8':
+        bio += ' ✓'
+
+    monkeypatch.setenv('PGCLIENTENCODING', client_encoding)
+
+    ## `COPY` falls back to the text format for any column type without a binary serializer
+    if copy_format == 'text':
+        monkeypatch.setattr(postgres, '_COPY_BINARY_SERIALIZERS', {})
+
+    class SpecialCharactersCatStream(CatStream):
 
         def generate_record(self):
             record = CatStream.generate_record(self)
-            record['name'] = postgres.RESERVED_NULL_DEFAULT
+            record['name'] = 'NULL'
+            record['bio'] = bio
             return record
 
-    with pytest.raises(postgres.PostgresError, match=r'.*NotNullViolation.*'):
-        main(CONFIG, input_stream=NullDefaultCatStream(20))
+    main(CONFIG, input_stream=SpecialCharactersCatStream(record_count))
+
+    with psycopg2.connect(**TEST_DB) as conn:
+        with conn.cursor() as cur:
+            cur.execute('SELECT DISTINCT name, bio FROM cats')
+            assert cur.fetchall() == [('NULL', bio)]
+
+
+def test_loading__datetime_precision_and_timezone(db_cleanup):
+    class PreciseDatetimeCatStream(CatStream):
+
+        def generate_record(self):
+            record = CatStream.generate_record(self)
+            record['adoption'] = {'adopted_on': '2020-01-01T10:00:00.123456789+02:00',
+                                  'was_foster': True,
+                                  'immunizations': []}
+            return record
+
+    main(CONFIG, input_stream=PreciseDatetimeCatStream(20))
+
+    with psycopg2.connect(**TEST_DB) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT to_char(adoption__adopted_on AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS.US') FROM cats")
+            assert cur.fetchall() == [('2020-01-01 08:00:00.123400',)]
+
+
+@pytest.mark.parametrize('record_count', [20, postgres.INSERT_ROWS_THRESHOLD + 50])
+def test_loading__invalid__number_out_of_double_range(db_cleanup, record_count):
+    class HeavyCatStream(CatStream):
+
+        def generate_record(self):
+            record = CatStream.generate_record(self)
+            record['weight'] = 0.5
+            return record
+
+        def __next__(self):
+            ## Numbers are parsed as `Decimal`s, which can exceed the range of a double
+            return CatStream.__next__(self).replace('"weight": 0.5', '"weight": 1.5e400')
+
+    stream = HeavyCatStream(record_count)
+    stream.schema = deepcopy(stream.schema)
+    stream.schema['schema']['properties']['weight'] = {'type': ['null', 'number']}
+
+    with pytest.raises(postgres.PostgresError) as excinfo:
+        main(CONFIG, input_stream=stream)
+
+    ## Rows written with `COPY` are serialized by the target, which names the offending column
+    if record_count >= postgres.INSERT_ROWS_THRESHOLD:
+        assert isinstance(excinfo.value.args[1], postgres.PostgresError)
+        assert '`weight`' in str(excinfo.value.args[1])
+
+    with psycopg2.connect(**TEST_DB) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('public.cats')")
+            assert cur.fetchone() == (None,)
+
+
+@pytest.mark.parametrize('record_count', [20, postgres.INSERT_ROWS_THRESHOLD + 50])
+def test_loading__invalid__serialization_error_is_raised(db_cleanup, monkeypatch, record_count):
+    class SerializationError(Exception):
+        pass
+
+    def serialize_table_record_datetime_value(self, remote_schema, streamed_schema, field, value):
+        raise SerializationError(value)
+
+    monkeypatch.setattr(postgres.PostgresTarget,
+                        'serialize_table_record_datetime_value',
+                        serialize_table_record_datetime_value)
+
+    with pytest.raises(postgres.PostgresError) as excinfo:
+        main(CONFIG, input_stream=CatStream(record_count, nested_count=1))
+
+    assert isinstance(excinfo.value.args[1], SerializationError)
 
 
 def test_loading__schema_version_0_gets_migrated_to_2(db_cleanup):
@@ -674,6 +766,37 @@ def test_loading__new_non_null_column(db_cleanup):
             assert cat_count == len([x for x in persisted_records if x[1] is not None])
 
 
+def test_loading__new_columns__added_together(db_cleanup, monkeypatch):
+    main(CONFIG, input_stream=CatStream(20))
+
+    stream = CatStream(20)
+    stream.schema = deepcopy(stream.schema)
+    new_columns = ['whisker_count', 'tail_length', 'favourite_toy']
+    for column in new_columns:
+        stream.schema['schema']['properties'][column] = {'type': ['null', 'string']}
+
+    calls = []
+
+    def spy(method):
+        def spied(self, cur, table_name, *args):
+            calls.append((method.__name__, table_name) + args)
+            return method(self, cur, table_name, *args)
+
+        return spied
+
+    monkeypatch.setattr(postgres.PostgresTarget, 'add_columns', spy(postgres.PostgresTarget.add_columns))
+    monkeypatch.setattr(postgres.PostgresTarget,
+                        '_set_table_metadata',
+                        spy(postgres.PostgresTarget._set_table_metadata))
+
+    main(CONFIG, input_stream=stream)
+
+    cats_calls = [call for call in calls if call[1] == 'cats']
+    assert [call[0] for call in cats_calls] == ['add_columns', '_set_table_metadata']
+    assert [name for name, _ in cats_calls[0][2]] == new_columns
+    assert set(new_columns) <= set(cats_calls[1][2]['mappings'])
+
+
 def test_loading__column_type_change(db_cleanup):
     cat_count = 20
     main(CONFIG, input_stream=CatStream(cat_count))
@@ -1835,6 +1958,108 @@ def test_upsert__invalid__primary_key_change(db_cleanup):
         main(CONFIG, input_stream=stream)
 
 
+def test_get_update_sql__cached_per_table_shape(db_cleanup):
+    columns = ['id', 'name', '_sdc_sequence']
+
+    with psycopg2.connect(**TEST_DB) as conn:
+        target = postgres.PostgresTarget(conn)
+
+        cats_sql = target._get_update_sql('cats', 'tmp_cats', ['id'], columns, []).as_string(conn)
+        dogs_sql = target._get_update_sql('dogs', 'tmp_dogs', ['id'], columns, []).as_string(conn)
+
+        ## Tables of the same shape share the merge SQL, with only the table names filled in
+        assert len(target._merge_sql_cache) == 1
+        assert '"public"."cats"' in cats_sql
+        assert '"public"."tmp_cats"' in cats_sql
+        assert cats_sql.replace('cats', 'dogs') == dogs_sql
+
+        target._get_update_sql('cats', 'tmp_cats', ['id'], columns + ['age'], [])
+        assert len(target._merge_sql_cache) == 2
+
+
+def test_get_update_sql__cache_bounded(db_cleanup, monkeypatch):
+    monkeypatch.setattr(postgres, 'MERGE_SQL_CACHE_SIZE', 2)
+
+    with psycopg2.connect(**TEST_DB) as conn:
+        target = postgres.PostgresTarget(conn)
+
+        for columns in [['id', 'a'], ['id', 'b'], ['id', 'a'], ['id', 'c']]:
+            target._get_update_sql('cats', 'tmp_cats', ['id'], columns, [])
+
+        ## The least recently used shape is evicted
+        assert list(target._merge_sql_cache) == [(('id',), ('id', 'a'), ()),
+                                                 (('id',), ('id', 'c'), ())]
+
+
+def test_table_caches__invalidated_within_write_batch(db_cleanup):
+    with psycopg2.connect(**TEST_DB) as conn:
+        with conn.cursor() as cur:
+            cur.execute('CREATE TABLE "public"."cats" ("id" bigint)')
+
+            target = postgres.PostgresTarget(conn)
+            ## As `write_batch` does for its duration
+            target._reset_table_caches(enabled=True)
+
+            assert list(target.get_table_schema(cur, 'cats')['schema']['properties']) == ['id']
+            target.add_column(cur, 'cats', 'name', {'type': ['null', 'string']})
+            assert set(target.get_table_schema(cur, 'cats')['schema']['properties']) == {'id', 'name'}
+
+            assert target.is_table_empty(cur, 'cats')
+            target.persist_rows(cur, {'name': 'cats', 'key_properties': []}, 'tmp_cats', ['id'], [[1]])
+            assert not target.is_table_empty(cur, 'cats')
+
+
+@pytest.mark.parametrize('record_count', [2, postgres.INSERT_ROWS_THRESHOLD + 50])
+def test_persist_rows__no_key_properties(db_cleanup, record_count):
+    ## Braces must survive formatting the cached merge SQL
+    columns = ['id', '{name}']
+    rows = [[i, 'cat {}'.format(i)] for i in range(record_count)]
+
+    with psycopg2.connect(**TEST_DB) as conn:
+        with conn.cursor() as cur:
+            cur.execute('CREATE TABLE "public"."cats" ("id" bigint, "{name}" text)')
+
+            target = postgres.PostgresTarget(conn)
+            remote_schema = {'name': 'cats', 'key_properties': []}
+
+            ## Without key properties, rows are neither deduplicated nor replaced
+            assert target.persist_rows(cur, remote_schema, 'tmp_cats_0', columns, rows) == record_count
+            assert target.persist_rows(cur, remote_schema, 'tmp_cats_1', columns, rows) == record_count
+
+            cur.execute('SELECT "id", "{name}" FROM "public"."cats" ORDER BY "id"')
+            assert cur.fetchall() == sorted([tuple(row) for row in rows] * 2)
+
+            cur.execute("SELECT to_regclass('public.tmp_cats_0'), to_regclass('public.tmp_cats_1')")
+            assert cur.fetchone() == (None, None)
+
+
+def test_persist_csv_rows__overridden_by_subclass(db_cleanup):
+    persisted_csv_tables = []
+
+    class CSVPostgresTarget(postgres.PostgresTarget):
+        def persist_csv_rows(self, cur, remote_schema, temp_table_name, columns, csv_rows):
+            persisted_csv_tables.append(remote_schema['name'])
+            return super(CSVPostgresTarget, self).persist_csv_rows(cur,
+                                                                  remote_schema,
+                                                                  temp_table_name,
+                                                                  columns,
+                                                                  csv_rows)
+
+    stream = CatStream(20, nested_count=2)
+    stream_buffer = singer_stream.BufferedSingerStream(stream.schema['stream'],
+                                                       stream.schema['schema'],
+                                                       stream.schema['key_properties'])
+    ## Records are processed in place, so the buffer is given copies of the records to compare against
+    for _ in range(20):
+        stream_buffer.add_record_message(deepcopy(stream.generate_record_message()))
+
+    with psycopg2.connect(**TEST_DB) as conn:
+        CSVPostgresTarget(conn).write_batch(stream_buffer)
+
+        assert sorted(persisted_csv_tables) == ['cats', 'cats__adoption__immunizations']
+        assert_records(conn, stream.records, 'cats', 'id')
+
+
 def test_nested_delete_on_parent(db_cleanup):
     stream = CatStream(100, nested_count=3)
     main(CONFIG, input_stream=stream)
@@ -2042,6 +2267,42 @@ def test_multiple_batches_by_memory_upsert(db_cleanup):
         assert_records(conn, stream.records, 'cats', 'id')
 
 
+def test_multiple_batches__unchanged_schema__remote_changed(db_cleanup):
+    stream = CatStream(30)
+
+    def write_batch(target):
+        stream_buffer = singer_stream.BufferedSingerStream(stream.schema['stream'],
+                                                           stream.schema['schema'],
+                                                           stream.schema['key_properties'])
+        for _ in range(10):
+            stream_buffer.add_record_message(stream.generate_record_message())
+        target.write_batch(stream_buffer)
+
+    with psycopg2.connect(**TEST_DB) as conn:
+        target = postgres.PostgresTarget(conn)
+
+        write_batch(target)
+        write_batch(target)
+
+        ## The second batch upserted the same schema against the same remote table, which is
+        ## remembered once per table
+        assert sorted(target._unchanged_table_schemas) == ['cats', 'cats__adoption__immunizations']
+
+        with conn.cursor() as cur:
+            target.drop_column(cur, 'cats', 'bio')
+            target.drop_column_mapping(cur, 'cats', 'bio')
+
+        ## The remote mappings changed, so the streamed schema is compared against them again
+        write_batch(target)
+
+        with conn.cursor() as cur:
+            cur.execute('SELECT count(*) FROM "public"."cats" WHERE "bio" IS NOT NULL')
+            assert cur.fetchone()[0] == 10
+
+        ## Which changed the remote table, so is not remembered
+        assert sorted(target._unchanged_table_schemas) == ['cats__adoption__immunizations']
+
+
 def test_loading__very_long_stream_name(db_cleanup):
     stream_name = 'extremely_______________long_cats'
     class LongCatStream(CatStream):